@@ -1,29 +1,34 @@
 from flask import Flask, render_template
 from sdwan import SDWANController, NetworkLink, TrafficFlow
 import os
+import threading
 
 app = Flask(__name__, template_folder='templates')
 
+# Built once at import so warm requests reuse the controller's path caches
+CONTROLLER = SDWANController()
+CONTROLLER.add_node("HQ", "hub")
+CONTROLLER.add_node("Branch1", "cpe")
+CONTROLLER.add_node("Branch2", "cpe")
+CONTROLLER.add_node("CloudGW", "cloud")
+
+CONTROLLER.add_link("HQ", "Branch1", NetworkLink(30, 5, 0.1, 50, 1))
+CONTROLLER.add_link("HQ", "Branch2", NetworkLink(40, 8, 0.2, 50, 1))
+CONTROLLER.add_link("Branch1", "Branch2", NetworkLink(20, 3, 0.05, 20, 2))
+CONTROLLER.add_link("Branch1", "CloudGW", NetworkLink(60, 15, 0.3, 100, 3))
+CONTROLLER.add_link("Branch2", "CloudGW", NetworkLink(70, 20, 0.4, 100, 3))
+
+CONTROLLER.add_traffic_flow("voip1", TrafficFlow("Branch1", "HQ", 0.5, 1, "latency"))
+CONTROLLER.add_traffic_flow("backup1", TrafficFlow("Branch1", "CloudGW", 20, 4, "throughput"))
+CONTROLLER.add_traffic_flow("video1", TrafficFlow("Branch2", "HQ", 5, 2, "reliability"))
+
+# simulate_traffic fills shared caches, and the dev server may run requests concurrently
+CONTROLLER_LOCK = threading.Lock()
+
 @app.route("/")
 def dashboard():
-    controller = SDWANController()
-    # Setup your network (same as before)
-    controller.add_node("HQ", "hub")
-    controller.add_node("Branch1", "cpe")
-    controller.add_node("Branch2", "cpe")
-    controller.add_node("CloudGW", "cloud")
-    
-    controller.add_link("HQ", "Branch1", NetworkLink(30, 5, 0.1, 50, 1))
-    controller.add_link("HQ", "Branch2", NetworkLink(40, 8, 0.2, 50, 1))
-    controller.add_link("Branch1", "Branch2", NetworkLink(20, 3, 0.05, 20, 2))
-    controller.add_link("Branch1", "CloudGW", NetworkLink(60, 15, 0.3, 100, 3))
-    controller.add_link("Branch2", "CloudGW", NetworkLink(70, 20, 0.4, 100, 3))
-    
-    controller.add_traffic_flow("voip1", TrafficFlow("Branch1", "HQ", 0.5, 1, "latency"))
-    controller.add_traffic_flow("backup1", TrafficFlow("Branch1", "CloudGW", 20, 4, "throughput"))
-    controller.add_traffic_flow("video1", TrafficFlow("Branch2", "HQ", 5, 2, "reliability"))
-    
-    results = controller.simulate_traffic()
+    with CONTROLLER_LOCK:
+        results = CONTROLLER.simulate_traffic()
     return render_template("dashboard.html", results=results)
 
 if __name__ == "__main__":
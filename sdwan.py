@@ -1,10 +1,15 @@
-import networkx as nx
-import random
+import functools
+import numpy as np
 import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Any, Callable, DefaultDict, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
-@dataclass
+from sdwan_hierarchy import ContractionHierarchy
+from sdwan_kernels import UNREACHABLE, bidir_dijkstra_csr, dijkstra_csr, floyd_warshall
+
+@dataclass(slots=True)
 class NetworkLink:
     latency: float  # in ms
     jitter: float   # in ms
@@ -12,7 +17,7 @@ class NetworkLink:
     bandwidth: float    # in Mbps
     cost: float        # monetary or preference cost
 
-@dataclass
+@dataclass(slots=True)
 class TrafficFlow:
     source: str
     destination: str
@@ -20,120 +25,470 @@ class TrafficFlow:
     priority: int  # 1 (highest) to 5 (lowest)
     sensitivity: str  # 'latency', 'throughput', 'reliability'
 
+LINK_METRICS: Tuple[str, ...] = ('latency', 'jitter', 'packet_loss', 'bandwidth', 'cost')
+# the metrics whose changes count towards drift
+DRIFT_METRICS: Tuple[str, ...] = ('latency', 'jitter', 'packet_loss')
+
+SENSITIVITIES: Tuple[str, ...] = ('latency', 'throughput', 'reliability')
+SENSITIVITY_INDEX: Dict[str, int] = {name: i for i, name in enumerate(SENSITIVITIES)}
+
+# indexed like SENSITIVITIES; evaluated on a single link's metrics or on the
+# whole metric columns at once. Scaled for int32 fixed point: latency in
+# 0.01 ms, 1/bandwidth in 1e-6 per Mbps, packet_loss + 0.1*jitter in 0.001.
+EDGE_WEIGHTS: Tuple[Callable[[Mapping[str, Any]], Any], ...] = (
+    lambda d: d['latency']*100,
+    lambda d: 1e6/d['bandwidth'],
+    lambda d: d['packet_loss']*1000 + d['jitter']*100,
+)
+MAX_EDGE_WEIGHT: int = int(np.iinfo(np.int32).max)
+# the link metrics each EDGE_WEIGHTS entry reads
+WEIGHT_INPUTS: Tuple[Set[str], ...] = (
+    {'latency'},
+    {'bandwidth'},
+    {'packet_loss', 'jitter'},
+)
+
+# estimated Dijkstra work (sources x (V+E) log V) below which handing batches
+# to the thread pool costs more in round trips than it saves
+THREADED_MIN_WORK: int = 1 << 17
+
+# rows indexed like SENSITIVITIES; columns weigh the path features
+# (latency, jitter, bandwidth as % of required, packet_loss, 1)
+SCORE_COEFF: np.ndarray = np.array([
+    [-0.5, -0.3, 0.0, 0.0, 100.0],
+    [0.0, 0.0, 1.0, 0.0, 0.0],
+    [0.0, -0.5, 0.0, -2.0, 100.0],
+])
+
+def _quantize(weights: Any) -> Any:
+    return np.rint(np.clip(weights, 0, MAX_EDGE_WEIGHT)).astype(np.int32)
+
+def _edge_key(a: int, b: int) -> Tuple[int, int]:
+    # links are undirected, so both orientations share one sorted node-id pair
+    return (a, b) if a < b else (b, a)
+
+def _dijkstra_trees(
+    csr: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    weights: np.ndarray,
+    sources: List[int],
+    scratch: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+) -> List[np.ndarray]:
+    indptr, indices, edge_ids = csr
+    return [dijkstra_csr(indptr, indices, edge_ids, weights, source, -1, *scratch)[1].copy() for source in sources]
+
 class SDWANController:
-    def __init__(self):
-        self.topology = nx.Graph()
-        self.flows = {}
-        self.policies = []
-        self.performance_metrics = {}
+    def __init__(self) -> None:
+        self.node_types: Dict[str, str] = {}
+        self.flows: Dict[str, TrafficFlow] = {}
+        self._flow_sensitivity: Dict[str, int] = {}
+        self.policies: List[Any] = []
+        self.performance_metrics: Dict[str, Any] = {}
+        self._node_id: Dict[str, int] = {}
+        self._node_names: List[str] = []
+        # link metrics live in one column per metric, indexed by dense edge id
+        self._edge_id: Dict[Tuple[int, int], int] = {}
+        self._edge_ends: List[Tuple[int, int]] = []
+        self._csr: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._hierarchy: Optional[ContractionHierarchy] = None
+        # set once contraction gave up on the current topology
+        self._hierarchy_failed: bool = False
+        self.latency: np.ndarray = np.empty(0)
+        self.jitter: np.ndarray = np.empty(0)
+        self.packet_loss: np.ndarray = np.empty(0)
+        self.bandwidth: np.ndarray = np.empty(0)
+        self.cost: np.ndarray = np.empty(0)
+        # per-sensitivity edge weights, rebuilt on demand once an input metric changes
+        self._weights: List[Optional[np.ndarray]] = [None] * len(SENSITIVITIES)
+        # hierarchy arc weights and unpacking triangles, customized per sensitivity
+        self._ch_metrics: List[Optional[Tuple[np.ndarray, np.ndarray]]] = [None] * len(SENSITIVITIES)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Dijkstra dist/parent/done/heap arrays, one set per sensitivity so
+        # concurrent batches never share them; sized for the current topology
+        self._scratch: List[Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]] = [None] * len(SENSITIVITIES)
+        # the same, with one row per direction, for point-to-point searches
+        self._bidir_scratch: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        self._path_cache: Dict[Tuple[str, str, int], List[str]] = {}
+        self._edge_to_paths: DefaultDict[Tuple[int, int], Set[Tuple[str, str, int]]] = defaultdict(set)
+        self._metrics_version: int = 0
+        # L1 change in DRIFT_METRICS since the last take_drift()
+        self._drift: float = 0.0
+        self._path_metrics: Callable[[Tuple[str, ...], int], Dict[str, float]] = functools.lru_cache(maxsize=1024)(self._compute_path_metrics)
+        self._path_edge_ids: Callable[[Tuple[str, ...]], np.ndarray] = functools.lru_cache(maxsize=1024)(self._compute_path_edge_ids)
+
+    def add_node(self, node_id: str, node_type: str) -> None:
+        self.node_types[node_id] = node_type
+        self._node_index(node_id)
 
-    def add_node(self, node_id: str, node_type: str):
-        self.topology.add_node(node_id, type=node_type)
+    def _node_index(self, node_id: str) -> int:
+        nid = self._node_id.get(node_id)
+        if nid is None:
+            nid = self._node_id[node_id] = len(self._node_names)
+            self._node_names.append(node_id)
+            self._topology_changed()
+        return nid
 
-    def add_link(self, node1: str, node2: str, link: NetworkLink):
-        self.topology.add_edge(node1, node2, **link.__dict__)
+    def add_link(self, node1: str, node2: str, link: NetworkLink) -> None:
+        u, v = self._node_index(node1), self._node_index(node2)
+        key = _edge_key(u, v)
+        eid = self._edge_id.get(key)
+        if eid is None:
+            eid = self._edge_id[key] = len(self._edge_id)
+            self._edge_ends.append((u, v))
+            self._topology_changed()
+            for metric in LINK_METRICS:
+                setattr(self, metric, np.append(getattr(self, metric), getattr(link, metric)))
+        else:
+            for metric in LINK_METRICS:
+                getattr(self, metric)[eid] = getattr(link, metric)
+        self._refresh_weights(LINK_METRICS)
+        # a new link can shorten any route, so nothing cached survives it
+        self._path_cache.clear()
+        self._edge_to_paths.clear()
+        self._metrics_version += 1
 
-    def add_traffic_flow(self, flow_id: str, flow: TrafficFlow):
+    def add_traffic_flow(self, flow_id: str, flow: TrafficFlow) -> None:
+        if flow.sensitivity not in SENSITIVITY_INDEX:
+            raise ValueError(f"Unknown sensitivity: {flow.sensitivity}")
+        if flow.required_bandwidth <= 0:
+            raise ValueError("required_bandwidth must be positive")
         self.flows[flow_id] = flow
+        self._flow_sensitivity[flow_id] = SENSITIVITY_INDEX[flow.sensitivity]
+
+    def update_link_metrics(self, node1: str, node2: str, **metrics: float) -> float:
+        # returns the L1 change in DRIFT_METRICS, which also accrues to take_drift()
+        u, v = self._node_id.get(node1), self._node_id.get(node2)
+        eid = None if u is None or v is None else self._edge_id.get(_edge_key(u, v))
+        if eid is None:
+            return 0.0
+        for metric in metrics:
+            if metric not in LINK_METRICS:
+                raise ValueError(f"Unknown link metric: {metric}")
+        old = self._link_row(eid)
+        for metric, value in metrics.items():
+            getattr(self, metric)[eid] = value
+        new = self._link_row(eid)
+        self._refresh_weights(metrics, eid)
+        self._invalidate_paths([eid], old, new)
+        self._metrics_version += 1
+        diff = float(sum(abs(new[metric] - old[metric]) for metric in DRIFT_METRICS if metric in metrics))
+        self._drift += diff
+        return diff
+
+    def update_all_link_metrics(self, **columns: np.ndarray) -> float:
+        # bulk form of update_link_metrics: each keyword replaces a whole column
+        old = self._link_columns()
+        # copies, so later in-place edits by the caller cannot bypass the caches
+        updates: Dict[str, np.ndarray] = {}
+        for metric, values in columns.items():
+            if metric not in LINK_METRICS:
+                raise ValueError(f"Unknown link metric: {metric}")
+            updates[metric] = np.array(values, dtype=np.float64, copy=True)
+            if updates[metric].shape != old[metric].shape:
+                raise ValueError(f"Expected {len(old[metric])} values for {metric}")
+        diff = 0.0
+        for metric, values in updates.items():
+            if metric in DRIFT_METRICS:
+                diff += float(np.abs(values - old[metric]).sum())
+            setattr(self, metric, values)
+        new = self._link_columns()
+        self._refresh_weights(columns)
+        changed = np.zeros(len(self._edge_id), dtype=bool)
+        for metric in columns:
+            changed |= new[metric] != old[metric]
+        self._invalidate_paths(np.flatnonzero(changed).tolist(), old, new)
+        self._metrics_version += 1
+        self._drift += diff
+        return diff
+
+    def take_drift(self) -> float:
+        # drift accrued by every metric update since the previous call
+        drift, self._drift = self._drift, 0.0
+        return drift
+
+    def _link_row(self, eid: int) -> Dict[str, Any]:
+        return {metric: getattr(self, metric)[eid] for metric in LINK_METRICS}
+
+    def _link_columns(self) -> Dict[str, np.ndarray]:
+        return {metric: getattr(self, metric) for metric in LINK_METRICS}
+
+    def _topology_changed(self) -> None:
+        self._csr = None
+        self._hierarchy = None
+        self._hierarchy_failed = False
+        self._ch_metrics = [None] * len(SENSITIVITIES)
+        self._scratch = [None] * len(SENSITIVITIES)
+        self._bidir_scratch = None
+
+    def _refresh_weights(self, metrics: Iterable[str], eid: Optional[int] = None) -> None:
+        # a single link's change is patched into the cached weights, anything
+        # broader rebuilds them on demand; hierarchies are recustomized lazily
+        for sensitivity, inputs in enumerate(WEIGHT_INPUTS):
+            if inputs.isdisjoint(metrics):
+                continue
+            weights = self._weights[sensitivity]
+            if eid is None or weights is None:
+                self._weights[sensitivity] = None
+                self._ch_metrics[sensitivity] = None
+                continue
+            weights[eid] = _quantize(EDGE_WEIGHTS[sensitivity](self._link_row(eid)))
+            # recustomized by the next point-to-point query, in one kernel
+            # pass however many links changed in between
+            self._ch_metrics[sensitivity] = None
+
+    def _invalidate_paths(self, eids: Iterable[int], old: Mapping[str, Any], new: Mapping[str, Any]) -> None:
+        for eid in eids:
+            for key in self._edge_to_paths.pop(_edge_key(*self._edge_ends[eid]), ()):
+                self._path_cache.pop(key, None)
+        # routes that avoid these edges are only stale if one got cheaper
+        for sensitivity, weight in enumerate(EDGE_WEIGHTS):
+            if np.any(weight(new) < weight(old)):
+                for key in [k for k in self._path_cache if k[2] == sensitivity]:
+                    del self._path_cache[key]
+
+    def _adjacency(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # CSR over both directions of every link: neighbours of node u are
+        # indices[indptr[u]:indptr[u+1]], reached through edge_ids[same slice]
+        if self._csr is None:
+            ends = np.array(self._edge_ends, dtype=np.int32).reshape(-1, 2)
+            tails = np.concatenate((ends[:, 0], ends[:, 1]))
+            heads = np.concatenate((ends[:, 1], ends[:, 0]))
+            eids = np.tile(np.arange(len(ends), dtype=np.int32), 2)
+            order = np.argsort(tails, kind='stable')
+            indptr = np.zeros(len(self._node_names) + 1, dtype=np.int32)
+            np.cumsum(np.bincount(tails, minlength=len(self._node_names)), out=indptr[1:])
+            self._csr = (indptr, heads[order], eids[order])
+        return self._csr
 
-    def update_link_metrics(self, node1: str, node2: str, **metrics):
-        if self.topology.has_edge(node1, node2):
-            for metric, value in metrics.items():
-                self.topology[node1][node2][metric] = value
+    def _edge_weights(self, sensitivity: int) -> np.ndarray:
+        weights = self._weights[sensitivity]
+        if weights is None:
+            weights = self._weights[sensitivity] = _quantize(EDGE_WEIGHTS[sensitivity](self._link_columns()))
+        return weights
+
+    def _dijkstra_scratch(self, sensitivity: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        scratch = self._scratch[sensitivity]
+        if scratch is None:
+            n, arcs = len(self._node_names), 2 * len(self._edge_ends)
+            scratch = self._scratch[sensitivity] = (
+                np.empty(n, dtype=np.int64),
+                np.empty(n, dtype=np.int32),
+                np.empty(n, dtype=np.bool_),
+                np.empty(arcs + 1, dtype=np.int64),
+                np.empty(arcs + 1, dtype=np.int32)
+            )
+        return scratch
+
+    def _point_to_point_path(self, source: str, destination: str, sensitivity: int) -> Optional[List[str]]:
+        # the hierarchy is built once per topology and customized once per
+        # metric change, after which each query only searches upward arcs;
+        # topologies too well connected to contract get a plain bidirectional search
+        hierarchy = self._hierarchy
+        if hierarchy is None and not self._hierarchy_failed:
+            try:
+                hierarchy = self._hierarchy = ContractionHierarchy(len(self._node_names), self._edge_ends)
+            except ValueError:
+                self._hierarchy_failed = True
+        if hierarchy is None:
+            return self._bidirectional_path(source, destination, sensitivity)
+        ch_metrics = self._ch_metrics[sensitivity]
+        if ch_metrics is None:
+            ch_metrics = self._ch_metrics[sensitivity] = hierarchy.customize(self._edge_weights(sensitivity))
+        nodes = hierarchy.query(ch_metrics[0], ch_metrics[1], self._node_id[source], self._node_id[destination])
+        if nodes is None:
+            return None
+        return [self._node_names[i] for i in nodes]
+
+    def _bidirectional_path(self, source: str, destination: str, sensitivity: int) -> Optional[List[str]]:
+        indptr, indices, edge_ids = self._adjacency()
+        scratch = self._bidir_scratch
+        if scratch is None:
+            n, arcs = len(self._node_names), len(indices)
+            scratch = self._bidir_scratch = (
+                np.empty((2, n), dtype=np.int64),
+                np.empty((2, n), dtype=np.int32),
+                np.empty((2, n), dtype=np.bool_),
+                np.empty((2, arcs + 1), dtype=np.int64),
+                np.empty((2, arcs + 1), dtype=np.int32)
+            )
+        src, dst = self._node_id[source], self._node_id[destination]
+        _, meet, parent_fwd, parent_bwd = bidir_dijkstra_csr(
+            indptr, indices, edge_ids, self._edge_weights(sensitivity), src, dst, *scratch
+        )
+        if meet < 0:
+            return None
+        nodes = [int(meet)]
+        while nodes[-1] != src:
+            nodes.append(int(parent_fwd[nodes[-1]]))
+        nodes.reverse()
+        while nodes[-1] != dst:
+            nodes.append(int(parent_bwd[nodes[-1]]))
+        return [self._node_names[i] for i in nodes]
+
+    def _dense_weights(self, sensitivity: int) -> np.ndarray:
+        n = len(self._node_names)
+        ends = np.array(self._edge_ends, dtype=np.int32).reshape(-1, 2)
+        weights = self._edge_weights(sensitivity)
+        matrix = np.full((n, n), UNREACHABLE, dtype=np.int64)
+        matrix[ends[:, 0], ends[:, 1]] = weights
+        matrix[ends[:, 1], ends[:, 0]] = weights
+        return matrix
+
+    def _prefers_dense(self, n_sources: int) -> bool:
+        # S Dijkstra trees cost ~S(V+E)logV, one dense all-pairs sweep ~V^3
+        n = len(self._node_names)
+        return bool(n_sources * (n + 2 * len(self._edge_id)) * np.log2(max(n, 2)) > n ** 3)
+
+    def _prefers_threads(self, batches: Mapping[int, List[int]]) -> bool:
+        if len(batches) < 2:
+            return False
+        n = len(self._node_names)
+        n_sources = sum(len(source_ids) for source_ids in batches.values())
+        return bool(n_sources * (n + 2 * len(self._edge_id)) * np.log2(max(n, 2)) > THREADED_MIN_WORK)
+
+    def _shortest_path_trees(self, pending: Mapping[int, Iterable[str]]) -> Dict[int, List[np.ndarray]]:
+        trees: Dict[int, List[np.ndarray]] = {}
+        batches: Dict[int, List[int]] = {}
+        for sensitivity, sources in pending.items():
+            source_ids = [self._node_id[source] for source in sources]
+            if self._prefers_dense(len(source_ids)):
+                # Floyd-Warshall already spreads its rows over every core
+                _, next_hop = floyd_warshall(self._dense_weights(sensitivity))
+                # links are undirected, so every node's first hop towards s is its parent in s's tree
+                trees[sensitivity] = [next_hop[:, s] for s in source_ids]
+            else:
+                batches[sensitivity] = source_ids
+        if not self._prefers_threads(batches):
+            for sensitivity, source_ids in batches.items():
+                trees[sensitivity] = _dijkstra_trees(
+                    self._adjacency(), self._edge_weights(sensitivity), source_ids, self._dijkstra_scratch(sensitivity)
+                )
+        else:
+            # the Dijkstra batches release the GIL and share nothing but
+            # read-only inputs, which are built here before any thread starts
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(SENSITIVITIES))
+            futures: Dict[int, Future[List[np.ndarray]]] = {
+                sensitivity: self._executor.submit(
+                    _dijkstra_trees, self._adjacency(), self._edge_weights(sensitivity), source_ids, self._dijkstra_scratch(sensitivity)
+                )
+                for sensitivity, source_ids in batches.items()
+            }
+            for sensitivity, future in futures.items():
+                trees[sensitivity] = future.result()
+        return trees
+
+    def _unwind_path(self, parent: np.ndarray, source: str, destination: str) -> Optional[List[str]]:
+        src, node = self._node_id[source], self._node_id[destination]
+        if node != src and parent[node] < 0:
+            return None
+        nodes = [node]
+        while node != src:
+            node = int(parent[node])
+            nodes.append(node)
+        return [self._node_names[i] for i in reversed(nodes)]
+
+    def _cache_path(self, key: Tuple[str, str, int], path: List[str]) -> None:
+        self._path_cache[key] = path
+        nids = [self._node_id[node] for node in path]
+        for i in range(len(nids)-1):
+            self._edge_to_paths[_edge_key(nids[i], nids[i+1])].add(key)
 
     def calculate_best_path(self, flow_id: str) -> List[str]:
         flow = self.flows[flow_id]
-        if flow.sensitivity == 'latency':
-            path = nx.shortest_path(self.topology, flow.source, flow.destination, weight='latency')
-        elif flow.sensitivity == 'throughput':
-            path = nx.shortest_path(self.topology, flow.source, flow.destination, weight=lambda u, v, d: 1/d['bandwidth'])
-        elif flow.sensitivity == 'reliability':
-            path = nx.shortest_path(self.topology, flow.source, flow.destination, weight=lambda u, v, d: d['packet_loss'] + d['jitter']*0.1)
-        else:
-            path = nx.shortest_path(self.topology, flow.source, flow.destination)
-        return path
+        sensitivity = self._flow_sensitivity[flow_id]
+        key = (flow.source, flow.destination, sensitivity)
+        path = self._path_cache.get(key)
+        if path is not None:
+            return list(path)
+        path = self._point_to_point_path(flow.source, flow.destination, sensitivity)
+        if path is None:
+            raise ValueError(f"No path between {flow.source} and {flow.destination}")
+        self._cache_path(key, path)
+        return list(path)
 
-    def simulate_traffic(self):
-        results = {}
+    def simulate_traffic(self) -> Dict[str, Dict[str, Any]]:
+        # one shortest-path tree per (sensitivity, source) serves every flow sharing it
+        pending: DefaultDict[int, DefaultDict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
         for flow_id, flow in self.flows.items():
-            path = self.calculate_best_path(flow_id)
-            path_metrics = self._get_path_metrics(path)
+            sensitivity = self._flow_sensitivity[flow_id]
+            if (flow.source, flow.destination, sensitivity) not in self._path_cache:
+                pending[sensitivity][flow.source].add(flow.destination)
+        trees = self._shortest_path_trees(pending)
+        for sensitivity, sources in pending.items():
+            for (source, destinations), parent in zip(sources.items(), trees[sensitivity]):
+                for destination in destinations:
+                    path = self._unwind_path(parent, source, destination)
+                    if path is not None:
+                        self._cache_path((source, destination, sensitivity), path)
+
+        flow_ids = list(self.flows)
+        paths = [self.calculate_best_path(flow_id) for flow_id in flow_ids]
+        path_metrics = [self._get_path_metrics(path) for path in paths]
+        scores = self._calculate_path_scores(flow_ids, path_metrics)
+        results: Dict[str, Dict[str, Any]] = {}
+        for i, flow_id in enumerate(flow_ids):
             results[flow_id] = {
-                'path': path,
-                'metrics': path_metrics,
-                'score': self._calculate_path_score(path_metrics, flow)
+                'path': paths[i],
+                'metrics': path_metrics[i],
+                'score': float(scores[i])
             }
         return results
 
-    def _get_path_metrics(self, path: List[str]) -> Dict:
-        latency = 0
-        jitter = 0
-        packet_loss = 1
-        bandwidth = float('inf')
-        
-        for i in range(len(path)-1):
-            edge = self.topology[path[i]][path[i+1]]
-            latency += edge['latency']
-            jitter += edge['jitter']
-            packet_loss *= (1 - edge['packet_loss']/100)
-            bandwidth = min(bandwidth, edge['bandwidth'])
-            
+    def _get_path_metrics(self, path: List[str]) -> Dict[str, float]:
+        return dict(self._path_metrics(tuple(path), self._metrics_version))
+
+    def _compute_path_metrics(self, path: Tuple[str, ...], version: int) -> Dict[str, float]:
+        eids = self._path_edge_ids(path)
+        survival = np.prod(1 - self.packet_loss[eids]*0.01)
         return {
-            'latency': latency,
-            'jitter': jitter,
-            'packet_loss': (1 - packet_loss) * 100,
-            'bandwidth': bandwidth
+            'latency': float(self.latency[eids].sum()),
+            'jitter': float(self.jitter[eids].sum()),
+            'packet_loss': float((1 - survival) * 100),
+            'bandwidth': float(self.bandwidth[eids].min(initial=np.inf))
         }
 
-    def _calculate_path_score(self, metrics: Dict, flow: TrafficFlow) -> float:
-        if flow.sensitivity == 'latency':
-            score = 100 - metrics['latency'] * 0.5 - metrics['jitter'] * 0.3
-        elif flow.sensitivity == 'throughput':
-            score = metrics['bandwidth'] / flow.required_bandwidth * 100
-        elif flow.sensitivity == 'reliability':
-            score = 100 - metrics['packet_loss'] * 2 - metrics['jitter'] * 0.5
-        return max(0, min(100, score))
+    def _compute_path_edge_ids(self, path: Tuple[str, ...]) -> np.ndarray:
+        # edge ids are never reassigned, so these stay valid across metric updates
+        nids = [self._node_id[node] for node in path]
+        return np.array([self._edge_id[_edge_key(nids[i], nids[i+1])] for i in range(len(nids)-1)], dtype=np.int32)
+
+    def _calculate_path_scores(self, flow_ids: List[str], path_metrics: List[Dict[str, float]]) -> np.ndarray:
+        # one feature row per flow, weighed by its sensitivity's SCORE_COEFF row
+        features = np.array([
+            [
+                metrics['latency'],
+                metrics['jitter'],
+                # a single-node path has infinite bandwidth; scores saturate at
+                # 100 anyway, and a finite ratio keeps 0 * inf out of other rows
+                min(metrics['bandwidth'] / self.flows[flow_id].required_bandwidth * 100, 100.0),
+                metrics['packet_loss'],
+                1.0
+            ]
+            for flow_id, metrics in zip(flow_ids, path_metrics)
+        ]).reshape(-1, SCORE_COEFF.shape[1])
+        sensitivities = np.array([self._flow_sensitivity[flow_id] for flow_id in flow_ids], dtype=np.intp)
+        return np.clip((features * SCORE_COEFF[sensitivities]).sum(axis=1), 0, 100)
 
 class DynamicPathOptimizer:
-    def __init__(self, controller: SDWANController):
-        self.controller = controller
-        self.history = []
-        
-    def monitor_links(self):
-        for u, v in self.controller.topology.edges():
-            new_latency = self.controller.topology[u][v]['latency'] * random.uniform(0.9, 1.1)
-            new_jitter = self.controller.topology[u][v]['jitter'] * random.uniform(0.8, 1.2)
-            new_loss = min(5, max(0, self.controller.topology[u][v]['packet_loss'] + random.uniform(-0.1, 0.1)))
-            self.controller.update_link_metrics(u, v, latency=new_latency, jitter=new_jitter, packet_loss=new_loss)
+    def __init__(self, controller: SDWANController, seed: Optional[int] = None) -> None:
+        self.controller: SDWANController = controller
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+
+    def monitor_links(self) -> None:
+        n = len(self.controller.latency)
+        self.controller.update_all_link_metrics(
+            latency=self.controller.latency * self.rng.uniform(0.9, 1.1, n),
+            jitter=self.controller.jitter * self.rng.uniform(0.8, 1.2, n),
+            packet_loss=np.clip(self.controller.packet_loss + self.rng.uniform(-0.1, 0.1, n), 0, 5)
+        )
     
-    def optimize_paths(self, threshold=10):
-        current_state = self._capture_state()
-        if self.history:
-            last_state = self.history[-1]
-            if self._state_diff(last_state, current_state) > threshold:
-                print("Reoptimizing paths...")
-                return True
-        self.history.append(current_state)
+    def optimize_paths(self, threshold: float = 10) -> bool:
+        if self.controller.take_drift() > threshold:
+            print("Reoptimizing paths...")
+            return True
         return False
-    
-    def _capture_state(self):
-        state = {}
-        for u, v in self.controller.topology.edges():
-            state[(u, v)] = {
-                'latency': self.controller.topology[u][v]['latency'],
-                'jitter': self.controller.topology[u][v]['jitter'],
-                'packet_loss': self.controller.topology[u][v]['packet_loss']
-            }
-        return state
-    
-    def _state_diff(self, state1, state2):
-        total_diff = 0
-        for key in state1:
-            for metric in ['latency', 'jitter', 'packet_loss']:
-                total_diff += abs(state1[key][metric] - state2[key][metric])
-        return total_diff
-
-def run_simulation():
+
+def run_simulation() -> None:
     controller = SDWANController()
     controller.add_node("HQ", "hub")
     controller.add_node("Branch1", "cpe")
@@ -0,0 +1,164 @@
+import heapq
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from sdwan_kernels import bidir_dijkstra_csr, ch_customize
+
+# Without witness search, contracting a node joins all its remaining
+# neighbours, so well-connected meshes fill in quadratically. Contraction
+# gives up once a node still has more neighbours than MAX_CONTRACTION_DEGREE
+# or the triangles outnumber TRIANGLE_BUDGET per node and link, which keeps
+# the build well under a second where it succeeds.
+MAX_CONTRACTION_DEGREE = 32
+TRIANGLE_BUDGET = 16
+
+
+class ContractionHierarchy:
+    # Customizable contraction hierarchy over an undirected topology. The node
+    # order and shortcut arcs depend only on which links exist; a metric is
+    # fitted with customize() whenever link weights change.
+    # Raises ValueError when the topology is too well connected to contract.
+
+    def __init__(self, n_nodes: int, edge_ends: Sequence[Tuple[int, int]]):
+        graph: List[Set[int]] = [set() for _ in range(n_nodes)]
+        for u, v in edge_ends:
+            if u != v:
+                graph[u].add(v)
+                graph[v].add(u)
+        self.rank, upward = self._contract(graph, TRIANGLE_BUDGET * (n_nodes + len(edge_ends)))
+        order = [int(v) for v in np.argsort(self.rank)]
+
+        # one arc per (lower, higher) ranked pair left adjacent by contraction
+        self._arc_index: Dict[Tuple[int, int], int] = {}
+        arc_lo: List[int] = []
+        arc_hi: List[int] = []
+        for v in order:
+            for u in upward[v]:
+                self._arc_index[(v, u)] = len(arc_lo)
+                arc_lo.append(v)
+                arc_hi.append(u)
+        self.arc_lo = np.array(arc_lo, dtype=np.int32)
+        self.arc_hi = np.array(arc_hi, dtype=np.int32)
+        self.edge_arc = np.full(len(edge_ends), -1, dtype=np.int32)
+        self.arc_edge = np.full(len(arc_lo), -1, dtype=np.int32)
+        for eid, (u, v) in enumerate(edge_ends):
+            if u != v:
+                self.edge_arc[eid] = self._arc(u, v)
+                self.arc_edge[self.edge_arc[eid]] = eid
+
+        # triangle t lets arcs tri_a[t] (v, u) and tri_b[t] (v, w) relax
+        # tri_c[t] (u, w), where v is the lowest ranked of the three
+        tri_a: List[int] = []
+        tri_b: List[int] = []
+        tri_c: List[int] = []
+        for v in order:
+            for u, w in combinations(upward[v], 2):
+                a, b, c = self._arc(v, u), self._arc(v, w), self._arc(u, w)
+                tri_a.append(a)
+                tri_b.append(b)
+                tri_c.append(c)
+        self.tri_a = np.array(tri_a, dtype=np.int32)
+        self.tri_b = np.array(tri_b, dtype=np.int32)
+        self.tri_c = np.array(tri_c, dtype=np.int32)
+
+        # upward graph (lower to higher rank) in CSR form, searched from both ends
+        by_tail = np.argsort(self.arc_lo, kind='stable')
+        self.indptr = np.zeros(n_nodes + 1, dtype=np.int32)
+        np.cumsum(np.bincount(self.arc_lo, minlength=n_nodes), out=self.indptr[1:])
+        self.indices = self.arc_hi[by_tail]
+        self.arc_ids = by_tail.astype(np.int32)
+
+        # query scratch, one row per search direction, reset by the kernel
+        self._dist = np.empty((2, n_nodes), dtype=np.int64)
+        self._parent = np.empty((2, n_nodes), dtype=np.int32)
+        self._done = np.empty((2, n_nodes), dtype=np.bool_)
+        self._heap_keys = np.empty((2, len(arc_lo) + 1), dtype=np.int64)
+        self._heap_vals = np.empty((2, len(arc_lo) + 1), dtype=np.int32)
+
+    @staticmethod
+    def _contract(graph: List[Set[int]], max_triangles: int) -> Tuple[np.ndarray, List[List[int]]]:
+        # Greedy order by edge difference (shortcuts added minus links
+        # removed), refreshed lazily. Every pair of a contracted node's
+        # remaining neighbours gets a shortcut, with no witness search, which
+        # keeps the arcs valid for any metric.
+        def edge_difference(v: int) -> int:
+            if len(graph[v]) > MAX_CONTRACTION_DEGREE:
+                # too many neighbours to count pairs; only contracted last, if ever
+                return len(graph[v]) ** 2
+            shortcuts = sum(1 for a, b in combinations(graph[v], 2) if b not in graph[a])
+            return shortcuts - len(graph[v])
+
+        rank = np.full(len(graph), -1, dtype=np.int32)
+        upward: List[List[int]] = [[] for _ in graph]
+        queue = [(edge_difference(v), v) for v in range(len(graph))]
+        heapq.heapify(queue)
+        contracted = 0
+        triangles = 0
+        while queue:
+            priority, v = heapq.heappop(queue)
+            if rank[v] >= 0:
+                continue
+            current = edge_difference(v)
+            if current > priority:
+                heapq.heappush(queue, (current, v))
+                continue
+            degree = len(graph[v])
+            triangles += degree * (degree - 1) // 2
+            if degree > MAX_CONTRACTION_DEGREE or triangles > max_triangles:
+                raise ValueError("Topology too dense for a contraction hierarchy")
+            rank[v] = contracted
+            contracted += 1
+            upward[v] = sorted(graph[v])
+            for a, b in combinations(upward[v], 2):
+                graph[a].add(b)
+                graph[b].add(a)
+            for a in upward[v]:
+                graph[a].discard(v)
+                heapq.heappush(queue, (edge_difference(a), a))
+        return rank, upward
+
+    def _arc(self, u: int, v: int) -> int:
+        return self._arc_index[(u, v) if self.rank[u] < self.rank[v] else (v, u)]
+
+    def customize(self, edge_weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        arc_weight = np.empty(len(self.arc_edge), dtype=np.int64)
+        arc_tri = np.empty(len(self.arc_edge), dtype=np.int32)
+        ch_customize(self.arc_edge, edge_weights, self.tri_a, self.tri_b, self.tri_c, arc_weight, arc_tri)
+        return arc_weight, arc_tri
+
+    def query(self, arc_weight: np.ndarray, arc_tri: np.ndarray, src: int, dst: int) -> Optional[List[int]]:
+        _, meet, parent_fwd, parent_bwd = bidir_dijkstra_csr(
+            self.indptr, self.indices, self.arc_ids, arc_weight, src, dst,
+            self._dist, self._parent, self._done, self._heap_keys, self._heap_vals
+        )
+        if meet < 0:
+            return None
+        hops = [int(meet)]
+        while hops[-1] != src:
+            hops.append(int(parent_fwd[hops[-1]]))
+        hops.reverse()
+        while hops[-1] != dst:
+            hops.append(int(parent_bwd[hops[-1]]))
+        path = [src]
+        for u, v in zip(hops, hops[1:]):
+            self._unpack(arc_tri, self._arc(u, v), u, path)
+        return path
+
+    def _unpack(self, arc_tri: np.ndarray, arc: int, start: int, path: List[int]) -> None:
+        # expand shortcuts back into links, appending the nodes after start
+        stack = [(arc, start)]
+        while stack:
+            arc, start = stack.pop()
+            end = int(self.arc_hi[arc] if self.arc_lo[arc] == start else self.arc_lo[arc])
+            t = int(arc_tri[arc])
+            if t < 0:
+                path.append(end)
+                continue
+            first, second = int(self.tri_a[t]), int(self.tri_b[t])
+            if self.arc_hi[first] != start:
+                first, second = second, first
+            middle = int(self.arc_lo[first])
+            stack.append((second, middle))
+            stack.append((first, start))
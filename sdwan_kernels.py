@@ -0,0 +1,180 @@
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # same kernels, interpreted instead of compiled
+    def njit(*args, **kwargs):  # type: ignore[no-redef]
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+    prange = range  # type: ignore[misc]
+
+
+# Edge weights are int32 fixed point and route lengths int64; UNREACHABLE
+# leaves headroom so adding a weight (or another length) cannot overflow
+UNREACHABLE = 1 << 62
+
+# 4-ary heap over parallel key/value arrays: half the depth of a binary heap,
+# and the four children of a slot sit next to each other in memory
+HEAP_ARITY = 4
+
+
+@njit(cache=True)
+def _heap_push(keys, vals, size, key, val):
+    i = size
+    while i > 0:
+        parent = (i - 1) // HEAP_ARITY
+        if keys[parent] <= key:
+            break
+        keys[i] = keys[parent]
+        vals[i] = vals[parent]
+        i = parent
+    keys[i] = key
+    vals[i] = val
+    return size + 1
+
+
+@njit(cache=True)
+def _heap_pop(keys, vals, size):
+    key = keys[0]
+    val = vals[0]
+    size -= 1
+    last_key = keys[size]
+    last_val = vals[size]
+    i = 0
+    while True:
+        first = HEAP_ARITY * i + 1
+        if first >= size:
+            break
+        child = first
+        for c in range(first + 1, min(first + HEAP_ARITY, size)):
+            if keys[c] < keys[child]:
+                child = c
+        if last_key <= keys[child]:
+            break
+        keys[i] = keys[child]
+        vals[i] = vals[child]
+        i = child
+    keys[i] = last_key
+    vals[i] = last_val
+    return key, val, size
+
+
+@njit(cache=True, nogil=True)
+def dijkstra_csr(indptr, indices, edge_ids, weights, src, dst, dist, parent, done, keys, vals):
+    # dst < 0 grows the full shortest-path tree instead of stopping early.
+    # dist, parent and done hold one slot per node and are reset here; keys
+    # and vals back the heap, which never outgrows arcs + 1 since every arc
+    # relaxes at most once. Returns dist and parent, so callers keeping a
+    # tree across calls must copy it.
+    dist.fill(UNREACHABLE)
+    parent.fill(-1)
+    done.fill(False)
+    dist[src] = 0
+    size = _heap_push(keys, vals, 0, 0, src)
+    while size > 0:
+        d, u, size = _heap_pop(keys, vals, size)
+        if done[u]:
+            continue
+        done[u] = True
+        if u == dst:
+            break
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[edge_ids[k]]
+            if nd < dist[v]:
+                dist[v] = nd
+                parent[v] = u
+                size = _heap_push(keys, vals, size, nd, v)
+    return dist, parent
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def floyd_warshall(weights):
+    # All-pairs shortest paths over a dense int64 weight matrix holding
+    # UNREACHABLE where there is no link. next_hop[i, j] is the node after i
+    # on the route to j, or -1 when j is unreachable.
+    n = weights.shape[0]
+    dist = weights.copy()
+    next_hop = np.full((n, n), -1, dtype=np.int32)
+    for i in prange(n):
+        dist[i, i] = 0
+        for j in range(n):
+            if dist[i, j] < UNREACHABLE:
+                next_hop[i, j] = j
+    for k in range(n):
+        # row k cannot improve in round k, so rows update independently while
+        # all threads stream the same cached row
+        dist_k = dist[k]
+        for i in prange(n):
+            d_ik = dist[i, k]
+            if d_ik == UNREACHABLE:
+                continue
+            for j in range(n):
+                via = d_ik + dist_k[j]
+                if via < dist[i, j]:
+                    dist[i, j] = via
+                    next_hop[i, j] = next_hop[i, k]
+    return dist, next_hop
+
+
+@njit(cache=True, nogil=True)
+def bidir_dijkstra_csr(indptr, indices, edge_ids, weights, src, dst, dist, parent, done, keys, vals):
+    # Point-to-point search growing one ball around src and one around dst
+    # over the same undirected CSR, either the full topology or the upward
+    # graph of a contraction hierarchy. The scratch arrays are dijkstra_csr's
+    # with a leading axis of 2, one row per side. Returns the route length,
+    # the node where the balls met (-1 if unreachable) and each side's
+    # parent array.
+    dist.fill(UNREACHABLE)
+    parent.fill(-1)
+    done.fill(False)
+    sizes = np.zeros(2, dtype=np.int64)
+    if src == dst:
+        return 0, src, parent[0], parent[1]
+    dist[0, src] = 0
+    dist[1, dst] = 0
+    sizes[0] = _heap_push(keys[0], vals[0], 0, 0, src)
+    sizes[1] = _heap_push(keys[1], vals[1], 0, 0, dst)
+    best = UNREACHABLE
+    meet = -1
+    while sizes[0] > 0 or sizes[1] > 0:
+        side = 0 if sizes[1] == 0 or (sizes[0] > 0 and keys[0, 0] <= keys[1, 0]) else 1
+        # each side stops on its own once its minimum reaches best; the usual
+        # sum-of-minima test is unsound on upward hierarchy searches
+        if keys[side, 0] >= best:
+            break
+        other = 1 - side
+        d, u, sizes[side] = _heap_pop(keys[side], vals[side], sizes[side])
+        if done[side, u]:
+            continue
+        done[side, u] = True
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[edge_ids[k]]
+            if nd < dist[side, v]:
+                dist[side, v] = nd
+                parent[side, v] = u
+                sizes[side] = _heap_push(keys[side], vals[side], sizes[side], nd, v)
+            if nd + dist[other, v] < best:
+                best = nd + dist[other, v]
+                meet = v
+    return best, meet, parent[0], parent[1]
+
+
+@njit(cache=True, nogil=True)
+def ch_customize(arc_edge, edge_weights, tri_a, tri_b, tri_c, arc_weight, arc_tri):
+    # Fit hierarchy arc weights to one metric. Triangles come ordered by the
+    # rank of their lowest node, so tri_a and tri_b are final before they
+    # relax tri_c. arc_tri records the winning triangle for path unpacking.
+    for a in range(arc_edge.shape[0]):
+        e = arc_edge[a]
+        arc_weight[a] = edge_weights[e] if e >= 0 else UNREACHABLE
+        arc_tri[a] = -1
+    for t in range(tri_c.shape[0]):
+        first = arc_weight[tri_a[t]]
+        second = arc_weight[tri_b[t]]
+        if first < UNREACHABLE and second < UNREACHABLE and first + second < arc_weight[tri_c[t]]:
+            arc_weight[tri_c[t]] = first + second
+            arc_tri[tri_c[t]] = t
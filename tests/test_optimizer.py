@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from sdwan import DynamicPathOptimizer, NetworkLink, SDWANController
+
+
+@pytest.fixture
+def controller():
+    controller = SDWANController()
+    for name in ("HQ", "Branch1", "Branch2"):
+        controller.add_node(name, "cpe")
+    controller.add_link("HQ", "Branch1", NetworkLink(30, 5, 0.1, 50, 1))
+    controller.add_link("HQ", "Branch2", NetworkLink(40, 8, 0.2, 50, 1))
+    controller.add_link("Branch1", "Branch2", NetworkLink(20, 3, 0.05, 20, 2))
+    return controller
+
+
+def test_outside_updates_count_towards_drift(controller):
+    optimizer = DynamicPathOptimizer(controller, seed=0)
+    assert not optimizer.optimize_paths()
+    controller.update_link_metrics("HQ", "Branch1", latency=500)
+    assert optimizer.optimize_paths()
+    # reading the drift resets it
+    assert not optimizer.optimize_paths()
+
+
+def test_drift_counts_only_monitored_metrics(controller):
+    optimizer = DynamicPathOptimizer(controller, seed=0)
+    assert controller.update_link_metrics("HQ", "Branch1", latency=33, jitter=4, bandwidth=500, cost=9) == pytest.approx(4)
+    assert controller.update_all_link_metrics(bandwidth=np.full(3, 1000.0), packet_loss=np.full(3, 1.0)) == pytest.approx(2.65)
+    assert controller.take_drift() == pytest.approx(6.65)
+    assert not optimizer.optimize_paths()
+
+
+def test_threshold(controller):
+    optimizer = DynamicPathOptimizer(controller, seed=0)
+    controller.update_link_metrics("HQ", "Branch1", latency=35)
+    controller.update_link_metrics("HQ", "Branch2", latency=44)
+    assert not optimizer.optimize_paths(threshold=10)
+    controller.update_link_metrics("HQ", "Branch1", latency=40)
+    controller.update_link_metrics("HQ", "Branch2", latency=50)
+    assert optimizer.optimize_paths(threshold=10)
+
+
+def test_monitor_links_drift_matches_columns(controller):
+    optimizer = DynamicPathOptimizer(controller, seed=1)
+    before = {metric: getattr(controller, metric).copy() for metric in ("latency", "jitter", "packet_loss")}
+    optimizer.monitor_links()
+    expected = sum(np.abs(getattr(controller, metric) - values).sum() for metric, values in before.items())
+    assert controller.take_drift() == pytest.approx(expected)
@@ -0,0 +1,168 @@
+import math
+import random
+import time
+
+import numpy as np
+import pytest
+
+from sdwan import LINK_METRICS, SENSITIVITIES, NetworkLink, SDWANController, TrafficFlow
+from sdwan_hierarchy import TRIANGLE_BUDGET, ContractionHierarchy
+
+nx = pytest.importorskip("networkx")
+
+# the real-valued costs the fixed-point EDGE_WEIGHTS approximate
+COSTS = {
+    'latency': lambda d: d['latency'],
+    'throughput': lambda d: 1 / d['bandwidth'],
+    'reliability': lambda d: d['packet_loss'] + d['jitter'] * 0.1,
+}
+
+
+def random_link(rnd):
+    return dict(
+        latency=rnd.uniform(1, 100),
+        jitter=rnd.uniform(0, 20),
+        packet_loss=rnd.uniform(0, 2),
+        bandwidth=rnd.choice([10, 20, 50, 100, 1000]),
+        cost=1.0
+    )
+
+
+def build(seed, n_nodes, n_links, n_flows):
+    rnd = random.Random(seed)
+    controller = SDWANController()
+    graph = nx.Graph()
+    names = [f"N{i}" for i in range(n_nodes)]
+    for name in names:
+        controller.add_node(name, 'cpe')
+    # a random spanning tree keeps every flow routable
+    links = {(names[rnd.randrange(i)], names[i]) for i in range(1, n_nodes)}
+    while len(links) < n_links:
+        a, b = rnd.sample(names, 2)
+        if (b, a) not in links:
+            links.add((a, b))
+    for a, b in sorted(links):
+        metrics = random_link(rnd)
+        controller.add_link(a, b, NetworkLink(**metrics))
+        graph.add_edge(a, b, **metrics)
+    for i in range(n_flows):
+        a, b = rnd.sample(names, 2)
+        controller.add_traffic_flow(f"f{i}", TrafficFlow(a, b, rnd.uniform(1, 50), 1, rnd.choice(SENSITIVITIES)))
+    return rnd, controller, graph, sorted(links)
+
+
+def assert_shortest(controller, graph, flow_id, path):
+    flow = controller.flows[flow_id]
+    cost = COSTS[flow.sensitivity]
+    assert path[0] == flow.source and path[-1] == flow.destination
+    assert all(graph.has_edge(u, v) for u, v in zip(path, path[1:]))
+    best = nx.shortest_path_length(graph, flow.source, flow.destination, weight=lambda u, v, d: cost(d))
+    got = sum(cost(graph[u][v]) for u, v in zip(path, path[1:]))
+    assert math.isclose(got, best, rel_tol=1e-3, abs_tol=1e-5)
+
+
+def assert_routes(controller, graph):
+    for flow_id, result in controller.simulate_traffic().items():
+        path = result['path']
+        assert_shortest(controller, graph, flow_id, path)
+        hops = list(zip(path, path[1:]))
+        assert math.isclose(result['metrics']['latency'], sum(graph[u][v]['latency'] for u, v in hops))
+        assert result['metrics']['bandwidth'] == min(graph[u][v]['bandwidth'] for u, v in hops)
+        assert math.isfinite(result['score'])
+        assert 0 <= result['score'] <= 100
+    # point-to-point queries go through the contraction hierarchy on a cold cache
+    controller._path_cache.clear()
+    controller._edge_to_paths.clear()
+    for flow_id in controller.flows:
+        assert_shortest(controller, graph, flow_id, controller.calculate_best_path(flow_id))
+
+
+# small dense topologies take the Floyd-Warshall batch, larger sparse ones Dijkstra
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("n_nodes, n_links, n_flows", [(6, 10, 40), (16, 32, 25)])
+def test_single_link_updates(seed, n_nodes, n_links, n_flows):
+    rnd, controller, graph, links = build(seed, n_nodes, n_links, n_flows)
+    for _ in range(4):
+        assert_routes(controller, graph)
+        for a, b in rnd.sample(links, 5):
+            metrics = random_link(rnd)
+            del metrics['cost']
+            if rnd.random() < 0.7:
+                del metrics['bandwidth']
+            controller.update_link_metrics(a, b, **metrics)
+            graph[a][b].update(metrics)
+    assert_routes(controller, graph)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_bulk_updates(seed):
+    rnd, controller, graph, links = build(seed, 16, 32, 25)
+    for _ in range(4):
+        assert_routes(controller, graph)
+        columns = {}
+        for metric in rnd.sample([m for m in LINK_METRICS if m != 'cost'], 2):
+            columns[metric] = np.array([random_link(rnd)[metric] for _ in links])
+        controller.update_all_link_metrics(**columns)
+        for a, b in links:
+            eid = controller._edge_id[tuple(sorted((controller._node_id[a], controller._node_id[b])))]
+            for metric in columns:
+                graph[a][b][metric] = float(getattr(controller, metric)[eid])
+    assert_routes(controller, graph)
+
+
+def test_single_node_path_scores_full_marks():
+    _, controller, _, _ = build(0, 6, 10, 0)
+    for sensitivity in SENSITIVITIES:
+        controller.add_traffic_flow(sensitivity, TrafficFlow("N0", "N0", 10, 1, sensitivity))
+    for sensitivity, result in controller.simulate_traffic().items():
+        assert result['path'] == ["N0"]
+        assert result['score'] == 100.0, sensitivity
+
+
+def test_small_batches_stay_off_the_thread_pool():
+    _, controller, graph, _ = build(0, 16, 32, 25)
+    assert len({flow.sensitivity for flow in controller.flows.values()}) > 1
+    assert_routes(controller, graph)
+    assert controller._executor is None
+
+
+@pytest.mark.parametrize("n_nodes, n_links", [(200, 600), (1000, 3000)])
+def test_dense_mesh_skips_hierarchy(n_nodes, n_links):
+    rnd, controller, graph, links = build(0, n_nodes, n_links, 20)
+    # contraction has to give up quickly, not fill in the whole mesh
+    start = time.perf_counter()
+    with pytest.raises(ValueError):
+        ContractionHierarchy(n_nodes, controller._edge_ends)
+    assert time.perf_counter() - start < 1.0
+    controller.calculate_best_path("f0")
+    assert controller._hierarchy is None
+    assert_routes(controller, graph)
+    for a, b in rnd.sample(links, 10):
+        metrics = random_link(rnd)
+        controller.update_link_metrics(a, b, **metrics)
+        graph[a][b].update(metrics)
+    assert_routes(controller, graph)
+
+
+def test_hierarchy_size_is_bounded():
+    # a dual-homed hub-and-spoke WAN contracts into a small hierarchy
+    controller = SDWANController()
+    graph = nx.Graph()
+    rnd = random.Random(0)
+    hubs = [f"H{i}" for i in range(4)]
+    links = [(a, b) for i, a in enumerate(hubs) for b in hubs[i + 1:]]
+    for i in range(500):
+        links += [(hubs[i % 4], f"B{i}"), (hubs[(i + 1) % 4], f"B{i}")]
+    for a, b in links:
+        metrics = random_link(rnd)
+        controller.add_link(a, b, NetworkLink(**metrics))
+        graph.add_edge(a, b, **metrics)
+    for i in range(20):
+        a, b = rnd.sample(sorted(graph), 2)
+        controller.add_traffic_flow(f"f{i}", TrafficFlow(a, b, 10, 1, rnd.choice(SENSITIVITIES)))
+    start = time.perf_counter()
+    hierarchy = ContractionHierarchy(len(graph), controller._edge_ends)
+    assert time.perf_counter() - start < 1.0
+    assert len(hierarchy.tri_c) <= TRIANGLE_BUDGET * (len(graph) + len(links))
+    assert_routes(controller, graph)
+    assert controller._hierarchy is not None